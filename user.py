@@ -19,30 +19,180 @@ SPDX-License-Identifier: Apache-2.0
 USER_TOOL_VERSION = "2025.09.13.009"
 USER_TOOL_VERSION_DESC = "No Friday.py Imports - Uses sys.modules Queue Registry (Native Python)"
 
+import atexit
+import functools
+import gzip
+import hmac
+import itertools
 import json
+import os
 import queue
+import string
 import sys
 import threading
 import time
 import traceback
-import uuid
 from dataclasses import dataclass
-from pathlib import Path
+from html import escape as html_escape
 from easy_mcp.server import MCPLogger, get_tool_token
-from typing import Dict, List, Optional, Union, BinaryIO, Tuple, Any
+from typing import Callable, Dict, Optional, Union, Tuple, Any
 
-@dataclass
+# _dumps pretty-prints (documentation); _dumps_compact is for machine-read tool results, where indentation
+# only adds bytes and keeps json off its C fast path
+try:
+    import orjson  # Optional: C encoder, several times faster than json.dumps(indent=2)
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, indent=2)
+
+
+# Response bodies carry friday.py data (non-str keys, big ints, NaN) that orjson rejects or rewrites, so stay on json
+def _dumps_compact(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+class ReplySlot:
+    """One-shot reply channel: a single value slot plus a threading.Event for the wakeup.
+    
+    Each UI request receives exactly one reply from the Qt main thread, so queue.Queue's deque, lock and
+    two Conditions are unnecessary. Keeps the queue.Queue-style put()/put_nowait() that friday.py calls;
+    this module waits on the event and reads the value directly.
+    """
+    __slots__ = ("value", "event")
+    
+    def __init__(self):
+        self.value = None
+        self.event = threading.Event()
+    
+    def put(self, item: Any, block: bool = True, timeout: Optional[float] = None) -> None:
+        self.value = item
+        self.event.set()  # Set after storing the value, so a woken waiter always sees it
+    
+    def put_nowait(self, item: Any) -> None:
+        self.put(item)
+    
+    def clear(self) -> None:
+        """Drop any stored reply and reset the wakeup, ready for reuse."""
+        self.value = None
+        self.event.clear()
+
+# One idle reply channel per thread. Tool calls are synchronous per thread, so a channel can be reused as soon as
+# its single reply has been consumed. Channels whose reply may still arrive (timeouts, async mode) are never
+# released, so a late reply can never be picked up by a later request.
+_reply_queue_pool = threading.local()
+
+def _acquire_reply_queue() -> ReplySlot:
+    """Take this thread's idle reply channel, or create one if there is none."""
+    reply_queue = getattr(_reply_queue_pool, "idle", None)
+    if reply_queue is None:
+        return ReplySlot()
+    _reply_queue_pool.idle = None
+    return reply_queue
+
+def _release_reply_queue(reply_queue: ReplySlot) -> None:
+    """Return a reply channel to this thread's pool. Only call once its reply has been received."""
+    reply_queue.clear()
+    _reply_queue_pool.idle = reply_queue
+
+# friday.py's UI request queue, registered in sys.modules at startup. Its identity is stable once friday.py is
+# up, so it is cached after the first successful lookup (a missing queue is looked up again next time).
+_ui_queue_ref = None
+
+def _get_ui_queue() -> Optional[Any]:
+    """Return friday.py's UI request queue, or None if it is not (yet) registered."""
+    global _ui_queue_ref
+    request_queue = _ui_queue_ref
+    if request_queue is None:
+        request_queue = _ui_queue_ref = sys.modules.get('friday_ui_queue')
+    return request_queue
+
+@dataclass(frozen=True)
 class UIRequest:
-    """Message structure for UI requests to Friday.py Qt main thread via sys.modules registry."""
+    """Message structure for UI requests to Friday.py Qt main thread via sys.modules registry.
+    
+    Immutable and slotted (no per-instance __dict__), since one is allocated for every UI round-trip.
+    __slots__ is declared by hand because dataclass(slots=True) needs Python 3.10+.
+    """
+    __slots__ = ("operation", "data", "reply_queue")
+    
     operation: str
     data: Dict[str, Any]
-    reply_queue: queue.Queue
+    reply_queue: ReplySlot
 
 # Constants
 TOOL_LOG_NAME = "USER"
+_VERSION_BANNER = f"user.py v{USER_TOOL_VERSION} ({USER_TOOL_VERSION_DESC})"  # Static; built once for log lines
+
+# Log lines are handed to a background writer thread, so tool calls never block on the logger's I/O;
+# the hot path is a single put. queue.SimpleQueue is a C-level unbounded FIFO, and one writer keeps lines in order.
+# The queue is registered in sys.modules (as friday.py does with its UI queue) so the writer thread and its
+# atexit flush are created once per process: a reloaded copy of this module reuses the running writer.
+_LOG_QUEUE_REGISTRY_KEY = "user_tool_log_queue"
+
+def _log_writer(log_queue: queue.SimpleQueue) -> None:
+    """Drain queued log lines into MCPLogger until the shutdown sentinel arrives."""
+    mcp_log = MCPLogger.log
+    while True:
+        entry = log_queue.get()
+        if entry is None:
+            return
+        try:
+            mcp_log(*entry)
+        except Exception:
+            pass  # A logging failure must never kill the writer
+
+def _start_log_writer() -> queue.SimpleQueue:
+    """Create the process-wide log queue and its writer thread, register both, and return the queue."""
+    log_queue = queue.SimpleQueue()
+    log_thread = threading.Thread(target=_log_writer, args=(log_queue,), name="user-tool-log-writer", daemon=True)
+    log_thread.start()
+    
+    def flush_log_queue() -> None:
+        """Let the writer drain whatever is still queued before the interpreter exits."""
+        log_queue.put(None)
+        log_thread.join(timeout=2)
+    
+    atexit.register(flush_log_queue)
+    sys.modules[_LOG_QUEUE_REGISTRY_KEY] = log_queue
+    return log_queue
+
+_log_queue = sys.modules.get(_LOG_QUEUE_REGISTRY_KEY)
+if _log_queue is None:
+    _log_queue = _start_log_writer()
+
+def _log(log_name: str, message: str, *lazy_args: Callable[[], Any], sync: bool = False) -> None:
+    """Queue a log line for the background writer, or write it straight away with sync=True.
+    
+    With lazy_args, message is a %-format string and each callable is invoked only when the line will be
+    emitted, e.g. _log(TOOL_LOG_NAME, "Stack trace: %s", traceback.format_exc). They run here on the
+    caller's thread, so traceback.format_exc still sees the exception being handled.
+    
+    Errors and stack traces use sync=True: a queued line is lost if the process dies (a Qt crash, os._exit)
+    before the writer reaches it, and those are exactly the lines needed to diagnose the crash.
+    """
+    if lazy_args:
+        if not _LOG_ENABLED:
+            return
+        message = message % tuple(arg() for arg in lazy_args)
+    if sync:
+        MCPLogger.log(log_name, message)
+    else:
+        _log_queue.put((log_name, message))
+
+# Whether this tool's log lines are emitted, resolved once at import. Guards the expensive diagnostics
+# (lazy _log() arguments such as traceback.format_exc, verbose banners) so they are skipped entirely when the server's
+# logger reports this tool's output as suppressed. Loggers without an is_enabled() check always log.
+_LOG_ENABLED = MCPLogger.is_enabled(TOOL_LOG_NAME) if hasattr(MCPLogger, "is_enabled") else True
 
 # Module-level token generated once at import time
 TOOL_UNLOCK_TOKEN = get_tool_token(__file__)
+_TOOL_UNLOCK_TOKEN_BYTES = TOOL_UNLOCK_TOKEN.encode("utf-8")
+
+def _token_matches(token: Any) -> bool:
+    """Check a caller-supplied token against TOOL_UNLOCK_TOKEN in constant time (no early exit on the first differing character)."""
+    return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), _TOOL_UNLOCK_TOKEN_BYTES)
 
 # Tool definitions
 TOOLS = [
@@ -111,11 +261,6 @@ TOOLS = [
                     "description": "Timeout in seconds to wait for user interaction (optional, 0 = no timeout)",
                     "default": 0
                 },
-                "message": {
-                    "type": "string",
-                    "description": "Test message for queue communication testing (used with test_queue operation)",
-                    "default": "Hello from user.py"
-                },
                 "center_on_screen": {
                     "type": "boolean",
                     "description": "Center window on screen (optional, defaults to true)",
@@ -158,7 +303,8 @@ TOOLS = [
                 },
                 "message": {
                     "type": "string",
-                    "description": "Toast notification message text (used with show_toast operation)"
+                    # Shared by two operations; deliberately no schema default, because show_toast must reject a missing message
+                    "description": "Toast notification message text (required for show_toast operation), or test message for queue communication testing (test_queue operation, defaults to 'Hello from user.py')"
                 },
                 "level": {
                     "type": "string",
@@ -205,9 +351,23 @@ TOOLS = [
                     "type": "number",
                     "description": "Only get messages after this timestamp (used with check_messages operation)"
                 },
+                "limit": {
+                    "type": "integer",
+                    "description": "Maximum number of most recent history entries to return, 0 for all (used with get_message_history operation)",
+                    "default": 200
+                },
+                "before_timestamp": {
+                    "type": "number",
+                    "description": "Only return history entries older than this timestamp, for paging back (used with get_message_history operation)"
+                },
+                "fields": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Only return these message fields, e.g. [\"id\", \"content\"] (used with check_messages operation)"
+                },
                 "tool_unlock_token": {
                     "type": "string",
-                    "description": "Security token, " + TOOL_UNLOCK_TOKEN + ", obtained from readme operation, or re-provided any time the AI lost context or gave a wrong token"
+                    "description": f"Security token, {TOOL_UNLOCK_TOKEN}, obtained from readme operation, or re-provided any time the AI lost context or gave a wrong token"
                 }
             },
             "required": ["operation", "tool_unlock_token"],
@@ -229,7 +389,7 @@ displaying rich content, or getting any kind of user input.
 This tool uses an hmac-based token system to ensure callers fully understand all details of
 using this tool, on every call. The token is specific to this installation, user, and code version.
 
-Your tool_unlock_token for this installation is: """ + TOOL_UNLOCK_TOKEN + """
+Your tool_unlock_token for this installation is: {TOOL_UNLOCK_TOKEN}
 
 You MUST include tool_unlock_token in the input dict for all operations.
 
@@ -264,9 +424,10 @@ The dashboard shows all AI↔User message history with timestamps and priorities
 ### 7. hide_dashboard - Hide the message dashboard window
 Hides the dashboard window (messages are still queued and accessible).
 
-### 8. get_message_history - Get complete message history
-Returns ALL messages (both AI-to-user and user-to-AI) regardless of read status.
-Useful for reviewing the entire conversation history.
+### 8. get_message_history - Get message history
+Returns messages (both AI-to-user and user-to-AI) regardless of read status, newest 200 by default, oldest first.
+Useful for reviewing the conversation history. The result's "has_more" is true when older entries
+were left out; fetch them by passing the oldest returned timestamp as before_timestamp, or use limit=0 for everything.
 
 ### 9. clear_messages - Clear all message queues
 Clears all messages from the queue (use with caution!).
@@ -300,8 +461,14 @@ Clears all messages from the queue (use with caution!).
 - **mark_as_read** (optional): Mark retrieved messages as read so they won't be returned again (default: true)
 - **filter_type** (optional): Filter messages by type (e.g., "response", "question")
 - **since_timestamp** (optional): Only get messages after this timestamp
+- **fields** (optional): Only return these fields of each message, e.g. ["id", "content"] (default: all fields: id, timestamp, direction, type, priority, content, requires_response, status)
+
+### For get_message_history operation:
+- **limit** (optional): Maximum number of most recent entries to return, 0 for all (default: 200)
+- **before_timestamp** (optional): Only return entries older than this timestamp (a number). To page back, pass the oldest timestamp from the previous page
+- The result includes **has_more**: true when older entries exist beyond the returned page
 
-### For show_dashboard, hide_dashboard, get_message_history, clear_messages operations:
+### For show_dashboard, hide_dashboard, clear_messages operations:
 - No additional parameters required (just operation and tool_unlock_token)
 
 ## Window Sizing Guidelines
@@ -475,7 +642,7 @@ When `auto_resize: true`, the window starts larger than requested, measures the
     "height": 300,
     "modal": true,
     "timeout": 120,
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -490,7 +657,7 @@ When `auto_resize: true`, the window starts larger than requested, measures the
     "width": 400,
     "height": 200,
     "modal": false,
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -502,7 +669,7 @@ When `auto_resize: true`, the window starts larger than requested, measures the
     "operation": "show_toast",
     "message": "File uploaded successfully!",
     "level": "success",
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -516,7 +683,7 @@ When `auto_resize: true`, the window starts larger than requested, measures the
     "msg_type": "status",
     "priority": "normal",
     "show_dashboard": true,
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -527,7 +694,7 @@ When `auto_resize: true`, the window starts larger than requested, measures the
   "input": {
     "operation": "check_messages",
     "mark_as_read": true,
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -551,12 +718,12 @@ Returns:
 }
 ```
 
-### 7. Get complete message history:
+### 7. Get recent message history (newest 200 entries; "has_more" tells you whether older ones exist):
 ```json
 {
   "input": {
     "operation": "get_message_history",
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -566,7 +733,7 @@ Returns:
 {
   "input": {
     "operation": "show_dashboard",
-    "tool_unlock_token": """ + f'"{TOOL_UNLOCK_TOKEN}"' + """
+    "tool_unlock_token": "{TOOL_UNLOCK_TOKEN}"
   }
 }
 ```
@@ -642,10 +809,82 @@ Or for cancellation/errors:
 - Quick status notifications (toast messages)
 - Background task completion alerts
 - Non-intrusive success/error messages
-"""
+""".replace("{TOOL_UNLOCK_TOKEN}", TOOL_UNLOCK_TOKEN)  # one substitution pass; the text is full of literal JSON/CSS braces, so str.format() is unsuitable
     }
 ]
 
+# MCP result _meta for readme responses: the readme is immutable per tool version, so clients may cache it
+_README_RESULT_META = {"cache_hint": "cache", "cache_key": USER_TOOL_VERSION}
+
+# Hot schema entries, bound once so call sites skip the repeated TOOLS[0][...] lookups
+_TOOL = TOOLS[0]
+_REAL_PARAMS = _TOOL["real_parameters"]
+
+# Public tool metadata (what listTools advertises), pre-serialized once so the server can send it as-is.
+# readme and real_parameters are deliberately excluded - they are only revealed via the readme operation.
+TOOLS_JSON = json.dumps([
+    {"name": tool["name"], "description": tool["description"], "parameters": tool["parameters"]}
+    for tool in TOOLS
+], separators=(",", ":"))
+
+# The readme payload is immutable for the life of the process, so it is serialized at most once
+# rather than re-encoding ~10KB of JSON on every readme call and every error response.
+# Built lazily: agents that already hold the token may never need it.
+_README_CACHED = None
+
+def _readme_payload() -> str:
+    """Return the serialized readme payload, building and memoizing it on first use."""
+    global _README_CACHED
+    if _README_CACHED is None:
+        _README_CACHED = "\n\n" + _dumps({
+            "description": _TOOL["readme"],
+            "parameters": _REAL_PARAMS # the caller knows these as the dict that goes inside "input" though
+        })
+    return _README_CACHED
+
+_README_GZ = None
+
+def _readme_payload_gz() -> bytes:
+    """Return the gzip-compressed UTF-8 readme payload, for transports that can send Content-Encoding: gzip."""
+    global _README_GZ
+    if _README_GZ is None:
+        _README_GZ = gzip.compress(_readme_payload().encode("utf-8"), compresslevel=6)
+    return _README_GZ
+
+# Validation lookup tables derived once from the (immutable) real_parameters schema, so that
+# validate_parameters() does not rebuild sets or walk nested schema dicts on every MCP call.
+_REAL_PARAMS_PROPERTIES = _REAL_PARAMS["properties"]
+_EXPECTED_PARAMS = frozenset(_REAL_PARAMS_PROPERTIES)
+_EXPECTED_PARAMS_TEXT = ', '.join(sorted(_EXPECTED_PARAMS))
+_REQUIRED = frozenset(_REAL_PARAMS.get("required", []))
+_READMEONLY_REQUIRED = frozenset(["operation"])  # Only operation is required for readme
+# Operations with extra required parameters beyond the schema-wide ones
+_REQUIRED_BY_OP = {
+    "readme": _READMEONLY_REQUIRED,
+    "show_toast": _REQUIRED | {"message"},
+    "send_message": _REQUIRED | {"content"},
+}
+# JSON schema type -> (exact Python type, error description, error hint); types not listed (e.g. "number") are not checked
+_SCHEMA_TYPES = {
+    "string": (str, "a string", "Please provide a string value."),
+    "object": (dict, "an object/dictionary", "Please provide a dictionary value."),
+    "integer": (int, "an integer", "Please provide an integer value."),
+    "boolean": (bool, "a boolean", "Please provide true or false."),
+    "array": (list, "an array/list", "Please provide a list value."),
+}
+# name -> (python_type, enum) for every parameter; enums become interned frozensets for O(1) membership
+_PARAM_CHECKS = {
+    param_name: (_SCHEMA_TYPES.get(param_schema.get("type"), (None,))[0],
+                 frozenset(map(sys.intern, param_schema["enum"])) if "enum" in param_schema else None)
+    for param_name, param_schema in _REAL_PARAMS_PROPERTIES.items()
+}
+# Defaults for the optional parameters, in schema order; copied as the starting point of every validated dict
+_PARAM_DEFAULTS = {
+    param_name: param_schema["default"]
+    for param_name, param_schema in _REAL_PARAMS_PROPERTIES.items()
+    if param_schema.get("default") is not None
+}
+
 def validate_parameters(input_param: Dict) -> Tuple[Optional[str], Dict]:
     """Validate input parameters against the real_parameters schema.
     
@@ -655,99 +894,80 @@ def validate_parameters(input_param: Dict) -> Tuple[Optional[str], Dict]:
     Returns:
         Tuple of (error_message, validated_params) where error_message is None if valid
     """
-    real_params_schema = TOOLS[0]["real_parameters"]
-    properties = real_params_schema["properties"]
-    required = real_params_schema.get("required", [])
-    
-    # For readme operation, don't require token
+    # Required parameters depend on the operation (e.g. readme doesn't require token). A non-string operation
+    # (possibly unhashable, e.g. a list) uses the default set, so the type check below can report it
     operation = input_param.get("operation")
-    if operation == "readme":
-        required = ["operation"]  # Only operation is required for readme
-    
-    # Check for unexpected parameters
-    expected_params = set(properties.keys())
-    provided_params = set(input_param.keys())
-    unexpected_params = provided_params - expected_params
+    required = _REQUIRED_BY_OP.get(operation, _REQUIRED) if type(operation) is str else _REQUIRED
     
-    if unexpected_params:
-        return f"Unexpected parameters provided: {', '.join(sorted(unexpected_params))}. Expected parameters are: {', '.join(sorted(expected_params))}. Please consult the attached doc.", {}
+    # Check for unexpected parameters (dict_keys views support set comparisons without copying,
+    # so the difference sets are only built when there is something to report)
+    provided_params = input_param.keys()
+    if not provided_params <= _EXPECTED_PARAMS:
+        unexpected_params = provided_params - _EXPECTED_PARAMS
+        return f"Unexpected parameters provided: {', '.join(sorted(unexpected_params))}. Expected parameters are: {_EXPECTED_PARAMS_TEXT}. Please consult the attached doc.", {}
     
     # Check for missing required parameters
-    missing_required = set(required) - provided_params
-    if missing_required:
+    if not required.issubset(provided_params):
+        missing_required = required - provided_params
         return f"Missing required parameters: {', '.join(sorted(missing_required))}. Required parameters are: {', '.join(sorted(required))}", {}
     
-    # Validate types and extract values
-    validated = {}
-    for param_name, param_schema in properties.items():
-        if param_name in input_param:
-            value = input_param[param_name]
-            expected_type = param_schema.get("type")
-            
-            # Type validation
-            if expected_type == "string" and not isinstance(value, str):
-                return f"Parameter '{param_name}' must be a string, got {type(value).__name__}. Please provide a string value.", {}
-            elif expected_type == "object" and not isinstance(value, dict):
-                return f"Parameter '{param_name}' must be an object/dictionary, got {type(value).__name__}. Please provide a dictionary value.", {}
-            elif expected_type == "integer" and not isinstance(value, int):
-                return f"Parameter '{param_name}' must be an integer, got {type(value).__name__}. Please provide an integer value.", {}
-            elif expected_type == "boolean" and not isinstance(value, bool):
-                return f"Parameter '{param_name}' must be a boolean, got {type(value).__name__}. Please provide true or false.", {}
-            elif expected_type == "array" and not isinstance(value, list):
-                return f"Parameter '{param_name}' must be an array/list, got {type(value).__name__}. Please provide a list value.", {}
-            
-            # Enum validation
-            if "enum" in param_schema:
-                allowed_values = param_schema["enum"]
-                if value not in allowed_values:
-                    return f"Parameter '{param_name}' must be one of {allowed_values}, got '{value}'. Please use one of the allowed values.", {}
-            
-            validated[param_name] = value
-        elif param_name in required:
-            # This should have been caught above, but double-check
-            return f"Required parameter '{param_name}' is missing. Please provide this required parameter.", {}
-        else:
-            # Use default value if specified
-            default_value = param_schema.get("default")
-            if default_value is not None:
-                validated[param_name] = default_value
+    # Validate only the parameters actually provided (a handful) rather than walking the whole schema;
+    # defaults come from one C-level copy of the precomputed table
+    validated = _PARAM_DEFAULTS.copy()
+    for param_name, value in input_param.items():
+        expected_type, allowed_values = _PARAM_CHECKS[param_name]
+        
+        # Type validation - exact type identity: JSON-decoded input never yields subclasses, and this
+        # stops bool (an int subclass) from passing as an integer, e.g. width=true
+        if expected_type is not None and type(value) is not expected_type:
+            _, type_desc, type_hint = _SCHEMA_TYPES[_REAL_PARAMS_PROPERTIES[param_name]["type"]]
+            return f"Parameter '{param_name}' must be {type_desc}, got {type(value).__name__}. {type_hint}", {}
+        
+        # Enum validation
+        if allowed_values is not None and value not in allowed_values:
+            return f"Parameter '{param_name}' must be one of {_REAL_PARAMS_PROPERTIES[param_name]['enum']}, got '{value}'. Please use one of the allowed values.", {}
+        
+        validated[param_name] = value
     
     return None, validated
 
-def readme(with_readme: bool = True) -> str:
+def readme(with_readme: bool = True, compressed: bool = False) -> Union[str, bytes]:
     """Return tool documentation.
     
     Args:
         with_readme: If False, returns empty string. If True, returns the complete tool documentation.
+        compressed: If True, returns the documentation as pre-built gzip bytes instead of a string.
         
     Returns:
         The complete tool documentation with the readme content as description, or empty string if with_readme is False.
     """
-    try:
-        if not with_readme:
-            return ''
-            
-        MCPLogger.log(TOOL_LOG_NAME, "Processing readme request")
-        return "\n\n" + json.dumps({
-            "description": TOOLS[0]["readme"],
-            "parameters": TOOLS[0]["real_parameters"] # the caller knows these as the dict that goes inside "input" though
-            #"real_parameters": TOOLS[0]["real_parameters"] # the caller knows these as the dict that goes inside "input" though
-        }, indent=2)
-    except Exception as e:
-        MCPLogger.log(TOOL_LOG_NAME, f"Error processing readme request: {str(e)}")
-        return ''
+    if not with_readme:
+        return b'' if compressed else ''
+        
+    _log(TOOL_LOG_NAME, "Processing readme request")
+    return _readme_payload_gz() if compressed else _readme_payload()
 
 def create_error_response(error_msg: str, with_readme: bool = True, include_traceback: bool = True) -> Dict:
     """Log and Create an error response that optionally includes the tool documentation.
     example:   if some_error: return create_error_response(f"some error with details: {str(e)}", with_readme=False)
     """
-    MCPLogger.log(TOOL_LOG_NAME, f"Error: {error_msg}")
+    _log(TOOL_LOG_NAME, f"Error: {error_msg}", sync=True)
     
     if include_traceback:
-        stack_trace = traceback.format_exc()
-        MCPLogger.log(TOOL_LOG_NAME, f"Full stack trace: {stack_trace}")
+        _log(TOOL_LOG_NAME, "Full stack trace: %s", traceback.format_exc, sync=True)
+    
+    return _error_result(error_msg, with_readme)
+
+@functools.lru_cache(maxsize=128)
+def _error_result(error_msg: str, with_readme: bool) -> Dict:
+    """Build (once per distinct message) the MCP error result for create_error_response.
     
-    return {"content": [{"type": "text", "text": f"{error_msg}{readme(with_readme)}"}], "isError": True}
+    The returned dict is shared between calls and must be treated as read-only.
+    """
+    # Append the pre-serialized readme directly: going through readme() would re-log a "readme request" for every error
+    return {"content": [{"type": "text", "text": error_msg + _readme_payload() if with_readme else error_msg}], "isError": True}
+
+_ERR_MISSING_HTML_URL = "Missing required parameter: must provide either 'html' or 'url'"
 
 def test_queue_communication(params: Dict) -> Dict:
     """Test queue communication with friday.py without any Qt operations.
@@ -762,18 +982,19 @@ def test_queue_communication(params: Dict) -> Dict:
         # Extract message parameter
         message = params.get("message", "Hello from user.py")
         
-        MCPLogger.log(TOOL_LOG_NAME, f"Testing queue communication with message: '{message}'")
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Testing queue communication with message: '{message}'")
         
         # Try to communicate via queue
         try:
             result = _test_queue_message_passing(message)
             return {
-                "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+                "content": [{"type": "text", "text": _dumps_compact(result)}],
                 "isError": False
             }
         except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Queue communication test failed: {str(e)}")
-            MCPLogger.log(TOOL_LOG_NAME, f"Stack trace: {traceback.format_exc()}")
+            _log(TOOL_LOG_NAME, f"Queue communication test failed: {str(e)}", sync=True)
+            _log(TOOL_LOG_NAME, "Stack trace: %s", traceback.format_exc, sync=True)
             return create_error_response(f"Queue communication test failed: {str(e)}", with_readme=False)
             
     except Exception as e:
@@ -790,24 +1011,24 @@ def _test_queue_message_passing(message: str) -> Dict:
         Dict with response from friday.py
     """
     try:
-        thread_id = threading.current_thread().ident
-        MCPLogger.log(TOOL_LOG_NAME, f"Testing queue message passing: {message} - user.py v{USER_TOOL_VERSION} ({USER_TOOL_VERSION_DESC}) [Thread: {thread_id}]")
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Testing queue message passing: {message} - {_VERSION_BANNER} [Thread: {threading.get_ident()}]")
         
         # Access friday.py's UI queue via sys.modules registry (no imports needed!)
         try:
-            request_queue = sys.modules.get('friday_ui_queue')
+            request_queue = _get_ui_queue()
             
             if request_queue is None:
                 return {"status": "error", "error": "No UI request queue available. Ensure friday.py is running with Qt support."}
                 
             
         except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Could not access friday.py queue via sys.modules: {e}")
-            MCPLogger.log(TOOL_LOG_NAME, f"Registry access error stack trace: {traceback.format_exc()}")
+            _log(TOOL_LOG_NAME, f"Could not access friday.py queue via sys.modules: {e}", sync=True)
+            _log(TOOL_LOG_NAME, "Registry access error stack trace: %s", traceback.format_exc, sync=True)
             return {"status": "error", "error": "Could not access friday.py UI queue. Ensure server was started via friday.py."}
         
         # Create a reply queue for this specific request
-        reply_queue = queue.Queue()
+        reply_queue = _acquire_reply_queue()
         
         # Prepare request data (no Qt-related parameters)
         request_data = {
@@ -823,7 +1044,8 @@ def _test_queue_message_passing(message: str) -> Dict:
             reply_queue=reply_queue
         )
         
-        MCPLogger.log(TOOL_LOG_NAME, f"Sending test_queue request to friday.py queue [Thread: {thread_id}]")
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Sending test_queue request to friday.py queue [Thread: {threading.get_ident()}]")
         
         # Send request to friday.py's main thread via queue
         request_queue.put(ui_request)
@@ -831,20 +1053,59 @@ def _test_queue_message_passing(message: str) -> Dict:
         # Wait for response from reply queue
         max_wait_time = 10  # 10 seconds should be plenty for a simple queue test
         
-        try:
-            response = reply_queue.get(timeout=max_wait_time)
-            return response
-            
-        except queue.Empty:
-            MCPLogger.log(TOOL_LOG_NAME, f"Queue test timed out after {max_wait_time} seconds")
+        # Wait on the slot's event directly: a timeout is a False return rather than a raised queue.Empty
+        if not reply_queue.event.wait(max_wait_time):
+            _log(TOOL_LOG_NAME, f"Queue test timed out after {max_wait_time} seconds", sync=True)
             return {"status": "timeout", "error": f"Queue test timed out after {max_wait_time} seconds"}
         
+        response = reply_queue.value
+        _release_reply_queue(reply_queue)
+        return response
+        
     except Exception as e:
-        MCPLogger.log(TOOL_LOG_NAME, f"CRITICAL ERROR in queue test: {str(e)}")
-        MCPLogger.log(TOOL_LOG_NAME, f"Complete stack trace: {traceback.format_exc()}")
+        _log(TOOL_LOG_NAME, f"CRITICAL ERROR in queue test: {str(e)}", sync=True)
+        _log(TOOL_LOG_NAME, "Complete stack trace: %s", traceback.format_exc, sync=True)
         return {"status": "error", "error": f"Error in queue test communication: {str(e)}"}
 
 
+# Window options for show_html_window: (name, default, expected type, minimum for integers), checked in this order
+_SHOW_HTML_SCHEMA = (
+    ("title", "User Interface", str, None),
+    ("width", 600, int, 1),
+    ("height", 400, int, 1),
+    ("modal", True, bool, None),
+    ("timeout", 0, int, 0),
+    ("center_on_screen", True, bool, None),
+    ("always_on_top", True, bool, None),
+    ("bring_to_front", True, bool, None),
+    ("auto_resize", False, bool, None),
+    ("resizable", False, bool, None),
+    ("wait_for_response", True, bool, None),
+)
+_SHOW_HTML_TYPE_NAMES = {str: "a string"}
+
+def _validate_window_options(params: Dict) -> Tuple[Optional[str], Dict]:
+    """Extract the show_html_window options from params, applying defaults and checking types in one pass.
+    
+    Returns:
+        Tuple of (error_message, options) where error_message is None if valid; options are keyed by
+        _show_webengine_window() argument name
+    """
+    options = {}
+    for name, default, expected_type, minimum in _SHOW_HTML_SCHEMA:
+        value = params.get(name, default)
+        # Identity checks only: booleans are the True/False singletons, and exact int excludes bool (width=true is invalid)
+        if expected_type is bool:
+            if value is not True and value is not False:
+                return f"Parameter '{name}' must be a boolean, got {type(value).__name__}.", {}
+        elif minimum is None:
+            if type(value) is not expected_type:
+                return f"Parameter '{name}' must be {_SHOW_HTML_TYPE_NAMES[expected_type]}, got {type(value).__name__}.", {}
+        elif type(value) is not int or value < minimum:
+            return f"Parameter '{name}' must be a {'positive' if minimum else 'non-negative'} integer, got {value}.", {}
+        options[name] = value
+    return None, options
+
 def show_html_window(params: Dict) -> Dict:
     """Show HTML content in a Qt WebEngine window.
     
@@ -861,7 +1122,7 @@ def show_html_window(params: Dict) -> Dict:
         
         # Must have either html or url, but not both
         if not html and not url:
-            return create_error_response("Missing required parameter: must provide either 'html' or 'url'", with_readme=True)
+            return create_error_response(_ERR_MISSING_HTML_URL, with_readme=True)
         if html and url:
             return create_error_response("Cannot specify both 'html' and 'url' - choose one", with_readme=True)
         
@@ -870,55 +1131,23 @@ def show_html_window(params: Dict) -> Dict:
         if url and not isinstance(url, str):
             return create_error_response(f"Parameter 'url' must be a string, got {type(url).__name__}.", with_readme=True)
         
-        # Extract optional parameters with defaults
-        title = params.get("title", "User Interface")
-        width = params.get("width", 600)
-        height = params.get("height", 400)
-        resizable = params.get("resizable", False)
-        modal = params.get("modal", True)
-        timeout = params.get("timeout", 0)
-        center_on_screen = params.get("center_on_screen", True)
-        always_on_top = params.get("always_on_top", True)
-        bring_to_front = params.get("bring_to_front", True)
-        auto_resize = params.get("auto_resize", False)
-        wait_for_response = params.get("wait_for_response", True)
+        # Extract and validate optional parameters with defaults
+        error_msg, options = _validate_window_options(params)
+        if error_msg:
+            return create_error_response(error_msg, with_readme=False)
         operation = params.get("operation", "show_dialog")
         
-        # Validate parameter types
-        if not isinstance(title, str):
-            return create_error_response(f"Parameter 'title' must be a string, got {type(title).__name__}.", with_readme=False)
-        if not isinstance(width, int) or width <= 0:
-            return create_error_response(f"Parameter 'width' must be a positive integer, got {width}.", with_readme=False)
-        if not isinstance(height, int) or height <= 0:
-            return create_error_response(f"Parameter 'height' must be a positive integer, got {height}.", with_readme=False)
-        if not isinstance(modal, bool):
-            return create_error_response(f"Parameter 'modal' must be a boolean, got {type(modal).__name__}.", with_readme=False)
-        if not isinstance(timeout, int) or timeout < 0:
-            return create_error_response(f"Parameter 'timeout' must be a non-negative integer, got {timeout}.", with_readme=False)
-        if not isinstance(center_on_screen, bool):
-            return create_error_response(f"Parameter 'center_on_screen' must be a boolean, got {type(center_on_screen).__name__}.", with_readme=False)
-        if not isinstance(always_on_top, bool):
-            return create_error_response(f"Parameter 'always_on_top' must be a boolean, got {type(always_on_top).__name__}.", with_readme=False)
-        if not isinstance(bring_to_front, bool):
-            return create_error_response(f"Parameter 'bring_to_front' must be a boolean, got {type(bring_to_front).__name__}.", with_readme=False)
-        if not isinstance(auto_resize, bool):
-            return create_error_response(f"Parameter 'auto_resize' must be a boolean, got {type(auto_resize).__name__}.", with_readme=False)
-        if not isinstance(resizable, bool):
-            return create_error_response(f"Parameter 'resizable' must be a boolean, got {type(resizable).__name__}.", with_readme=False)
-        if not isinstance(wait_for_response, bool):
-            return create_error_response(f"Parameter 'wait_for_response' must be a boolean, got {type(wait_for_response).__name__}.", with_readme=False)
-        
-        # Log the request
-        content_type = "URL" if url else "HTML"
-        content_preview = url if url else f"{len(html)} chars"
-        wait_mode = "async" if not wait_for_response else "sync"
-        MCPLogger.log(TOOL_LOG_NAME, f"Processing {operation} request ({wait_mode}): {content_type}={content_preview}, title='{title}', size={width}x{height}, modal={modal}, resizable={resizable}")
+        # Log the request (the single log line for this request; the preview is only built when it will be emitted)
+        if _LOG_ENABLED:
+            content_preview = f"URL={url}" if url else f"HTML={len(html)} chars"
+            wait_mode = "sync" if options["wait_for_response"] else "async"
+            _log(TOOL_LOG_NAME, f"Processing {operation} request ({wait_mode}): {content_preview}, title='{options['title']}', size={options['width']}x{options['height']}, modal={options['modal']}, resizable={options['resizable']} - {_VERSION_BANNER} [Thread: {threading.get_ident()}]")
         
         # Try to show the window
         try:
-            result = _show_webengine_window(html, title, width, height, modal, timeout, center_on_screen, always_on_top, bring_to_front, auto_resize, url, resizable, wait_for_response)
+            result = _show_webengine_window(html=html, url=url, **options)
             return {
-                "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+                "content": [{"type": "text", "text": _dumps_compact(result)}],
                 "isError": False
             }
         except ImportError as e:
@@ -931,21 +1160,28 @@ def show_html_window(params: Dict) -> Dict:
             else:
                 raise
         except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Exception in show_html_window: {str(e)}")
-            MCPLogger.log(TOOL_LOG_NAME, f"Stack trace: {traceback.format_exc()}")
+            _log(TOOL_LOG_NAME, f"Exception in show_html_window: {str(e)}", sync=True)
+            _log(TOOL_LOG_NAME, "Stack trace: %s", traceback.format_exc, sync=True)
             return create_error_response(f"Error showing HTML window: {str(e)}", with_readme=False)
             
     except Exception as e:
         return create_error_response(f"Error processing HTML window request: {str(e)}", with_readme=True)
 
 
+# Fixed result for wait_for_response=False; shared between calls, so treat it as read-only
+_ASYNC_SUCCESS = {
+    "status": "success",
+    "message": "Window opened successfully (async mode - not waiting for user response)",
+    "async": True
+}
+
 def _show_webengine_window(html: str, title: str, width: int, height: int, modal: bool, timeout: int, 
                           center_on_screen: bool = True, always_on_top: bool = True, bring_to_front: bool = True, 
                           auto_resize: bool = False, url: str = None, resizable: bool = False, 
                           wait_for_response: bool = True) -> Dict:
     """Internal function to show HTML popup via thread-safe queue message passing to friday.py.
     
-    Uses Python's native queue.Queue for fast, reliable communication between MCP thread and Qt main thread.
+    Uses a one-shot ReplySlot (threading.Event + value) reply channel for fast, reliable communication between MCP thread and Qt main thread.
     Follows the request-reply pattern from Thread_message_passing_in_Python.md
     
     Args:
@@ -967,24 +1203,21 @@ def _show_webengine_window(html: str, title: str, width: int, height: int, modal
         Dict with user response data (or immediate status if wait_for_response=False)
     """
     try:
-        thread_id = threading.current_thread().ident
-        MCPLogger.log(TOOL_LOG_NAME, f"Using native queue message passing for HTML popup: {title} - user.py v{USER_TOOL_VERSION} ({USER_TOOL_VERSION_DESC}) [Thread: {thread_id}]")
-        
         # Access friday.py's UI queue via sys.modules registry (no imports needed!)
         try:
-            request_queue = sys.modules.get('friday_ui_queue')
+            request_queue = _get_ui_queue()
             
             if request_queue is None:
                 return {"status": "error", "error": "No UI request queue available. Ensure friday.py is running with Qt support."}
                 
             
         except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Could not access friday.py queue via sys.modules: {e}")
-            MCPLogger.log(TOOL_LOG_NAME, f"Registry access error stack trace: {traceback.format_exc()}")
+            _log(TOOL_LOG_NAME, f"Could not access friday.py queue via sys.modules: {e}", sync=True)
+            _log(TOOL_LOG_NAME, "Registry access error stack trace: %s", traceback.format_exc, sync=True)
             return {"status": "error", "error": "Could not access friday.py UI queue. Ensure server was started via friday.py."}
         
         # Create a reply queue for this specific request
-        reply_queue = queue.Queue()
+        reply_queue = _acquire_reply_queue()
         
         # Window positioning and behavior options are now passed as function parameters
         
@@ -1016,27 +1249,24 @@ def _show_webengine_window(html: str, title: str, width: int, height: int, modal
         
         # If not waiting for response, return immediately
         if not wait_for_response:
-            MCPLogger.log(TOOL_LOG_NAME, f"Async mode: Window opened, returning immediately without waiting")
-            return {
-                "status": "success",
-                "message": "Window opened successfully (async mode - not waiting for user response)",
-                "async": True
-            }
+            _log(TOOL_LOG_NAME, "Async mode: Window opened, returning immediately without waiting")
+            return _ASYNC_SUCCESS
         
         # Wait for response from reply queue
         max_wait_time = timeout + 5 if timeout > 0 else 65  # Add 5 second buffer or default to 65s
         
-        try:
-            response = reply_queue.get(timeout=max_wait_time)
-            return response
-            
-        except queue.Empty:
-            MCPLogger.log(TOOL_LOG_NAME, f"UI request timed out after {max_wait_time} seconds")
+        # Wait on the slot's event directly: a timeout is a False return rather than a raised queue.Empty
+        if not reply_queue.event.wait(max_wait_time):
+            _log(TOOL_LOG_NAME, f"UI request timed out after {max_wait_time} seconds", sync=True)
             return {"status": "timeout", "error": f"UI request timed out after {max_wait_time} seconds"}
         
+        response = reply_queue.value
+        _release_reply_queue(reply_queue)
+        return response
+        
     except Exception as e:
-        MCPLogger.log(TOOL_LOG_NAME, f"CRITICAL ERROR in queue message passing: {str(e)}")
-        MCPLogger.log(TOOL_LOG_NAME, f"Complete stack trace: {traceback.format_exc()}")
+        _log(TOOL_LOG_NAME, f"CRITICAL ERROR in queue message passing: {str(e)}", sync=True)
+        _log(TOOL_LOG_NAME, "Complete stack trace: %s", traceback.format_exc, sync=True)
         return {"status": "error", "error": f"Error in UI communication: {str(e)}"}
 
 
@@ -1061,31 +1291,75 @@ def show_toast_notification(params: Dict) -> Dict:
             return create_error_response(f"Parameter 'message' must be a string, got {type(message).__name__}", with_readme=False)
         
         # Validate level parameter
-        valid_levels = ["info", "warning", "error", "success"]
-        if level not in valid_levels:
-            return create_error_response(f"Parameter 'level' must be one of {valid_levels}, got '{level}'", with_readme=False)
+        if level not in _VALID_TOAST_LEVELS:
+            return create_error_response(f"Parameter 'level' must be one of {_VALID_TOAST_LEVELS_TEXT}, got '{level}'", with_readme=False)
         
-        MCPLogger.log(TOOL_LOG_NAME, f"Showing toast notification: [{level}] {message}")
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Showing toast notification: [{level}] {message}")
         
         # Try to emit the toast message via friday.py's message queue
         try:
             result = _emit_toast_message(message, level)
             return {
-                "content": [{"type": "text", "text": json.dumps(result, indent=2)}],
+                "content": [{"type": "text", "text": _dumps_compact(result)}],
                 "isError": False
             }
         except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Toast notification failed: {str(e)}")
-            MCPLogger.log(TOOL_LOG_NAME, f"Stack trace: {traceback.format_exc()}")
+            _log(TOOL_LOG_NAME, f"Toast notification failed: {str(e)}", sync=True)
+            _log(TOOL_LOG_NAME, "Stack trace: %s", traceback.format_exc, sync=True)
             return create_error_response(f"Toast notification failed: {str(e)}", with_readme=False)
             
     except Exception as e:
         return create_error_response(f"Error processing toast notification: {str(e)}", with_readme=True)
 
 
+# Toast level -> visual prefix, prepended to the message text
+_TOAST_PREFIXES = {
+    "info": "ℹ️",
+    "success": "✅",
+    "warning": "⚠️",
+    "error": "❌"
+}
+_DEFAULT_TOAST_PREFIX = _TOAST_PREFIXES["info"]
+_VALID_TOAST_LEVELS = frozenset(("info", "warning", "error", "success"))
+_VALID_TOAST_LEVELS_TEXT = str(["info", "warning", "error", "success"])  # Ordered listing for the error message
+
+# friday.py's engine._emit_message bound method. The engine lives for the whole process, so once found it is
+# reused; failed lookups are not cached, so toasts sent before the engine is up keep retrying.
+_cached_emit_fn = None
+
+def _resolve_emit_fn() -> Tuple[Optional[Any], Optional[Dict]]:
+    """Look up friday.py's engine._emit_message and cache it.
+    
+    Returns:
+        Tuple of (emit_fn, error_result) where emit_fn is None and error_result explains why if unavailable
+    """
+    global _cached_emit_fn
+    friday_module = sys.modules.get('__main__')
+    
+    if friday_module is None:
+        return None, {"status": "error", "error": "Could not access friday.py module. Ensure server was started via friday.py."}
+    
+    # Get the engine instance which has the _emit_message method
+    engine = getattr(friday_module, 'engine', None)
+    
+    if engine is None:
+        return None, {"status": "error", "error": "No engine instance available. Ensure friday.py is running with Qt support."}
+    
+    # Check if engine has the _emit_message method
+    emit_message = getattr(engine, '_emit_message', None)
+    if emit_message is None:
+        return None, {"status": "error", "error": "Engine does not have _emit_message method. Ensure friday.py version supports toast messages."}
+    
+    _cached_emit_fn = emit_message
+    return emit_message, None
+
 def _emit_toast_message(message: str, level: str) -> Dict:
     """Internal function to emit a toast message to friday.py's message queue.
     
+    Once engine._emit_message has been resolved this is a direct call with no registry lookups;
+    only the first toasts (before the engine is found) take the lookup path.
+    
     Args:
         message: The toast message text
         level: Message level (info, warning, error, success)
@@ -1093,62 +1367,34 @@ def _emit_toast_message(message: str, level: str) -> Dict:
     Returns:
         Dict with status information
     """
-    try:
-        thread_id = threading.current_thread().ident
-        MCPLogger.log(TOOL_LOG_NAME, f"Emitting toast message: [{level}] {message} [Thread: {thread_id}]")
-        
-        # Access friday.py's engine instance via sys.modules
+    emit_message = _cached_emit_fn
+    if emit_message is None:
+        # Access friday.py's engine._emit_message via sys.modules (resolved once, then cached)
         try:
-            friday_module = sys.modules.get('__main__')
-            
-            if friday_module is None:
-                return {"status": "error", "error": "Could not access friday.py module. Ensure server was started via friday.py."}
-            
-            # Get the engine instance which has the _emit_message method
-            engine = getattr(friday_module, 'engine', None)
-            
-            if engine is None:
-                return {"status": "error", "error": "No engine instance available. Ensure friday.py is running with Qt support."}
-            
-            # Check if engine has the _emit_message method
-            if not hasattr(engine, '_emit_message'):
-                return {"status": "error", "error": "Engine does not have _emit_message method. Ensure friday.py version supports toast messages."}
-            
+            emit_message, error_result = _resolve_emit_fn()
         except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Could not access friday.py engine: {e}")
-            MCPLogger.log(TOOL_LOG_NAME, f"Registry access error stack trace: {traceback.format_exc()}")
+            _log(TOOL_LOG_NAME, f"Could not access friday.py engine: {e}", sync=True)
+            _log(TOOL_LOG_NAME, "Registry access error stack trace: %s", traceback.format_exc, sync=True)
             return {"status": "error", "error": "Could not access friday.py engine. Ensure server was started via friday.py."}
-        
-        # Format message with level prefix for visual distinction
-        level_prefixes = {
-            "info": "ℹ️",
-            "success": "✅",
-            "warning": "⚠️",
-            "error": "❌"
-        }
-        prefix = level_prefixes.get(level, "ℹ️")
-        formatted_message = f"{prefix} {message}"
-        
-        # Emit the message using the engine's _emit_message method
-        try:
-            engine._emit_message(formatted_message, level)
-            MCPLogger.log(TOOL_LOG_NAME, f"Toast message emitted successfully: [{level}] {message}")
-            
-            return {
-                "status": "success",
-                "message": "Toast notification sent successfully",
-                "level": level,
-                "text": message
-            }
-            
-        except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Failed to emit message: {str(e)}")
-            return {"status": "error", "error": f"Failed to emit toast message: {str(e)}"}
-        
+        if emit_message is None:
+            return error_result
+    
+    # Emit the message with its level prefix for visual distinction
+    try:
+        emit_message(f"{_TOAST_PREFIXES.get(level, _DEFAULT_TOAST_PREFIX)} {message}", level)
     except Exception as e:
-        MCPLogger.log(TOOL_LOG_NAME, f"CRITICAL ERROR in toast emission: {str(e)}")
-        MCPLogger.log(TOOL_LOG_NAME, f"Complete stack trace: {traceback.format_exc()}")
-        return {"status": "error", "error": f"Error in toast communication: {str(e)}"}
+        _log(TOOL_LOG_NAME, f"Failed to emit message: {str(e)}", sync=True)
+        return {"status": "error", "error": f"Failed to emit toast message: {str(e)}"}
+    
+    if _LOG_ENABLED:
+        _log(TOOL_LOG_NAME, f"Toast message emitted: [{level}] {message} [Thread: {threading.get_ident()}]")
+    
+    return {
+        "status": "success",
+        "message": "Toast notification sent successfully",
+        "level": level,
+        "text": message
+    }
 
 
 def collect_api_key_from_user(params: Dict) -> Dict:
@@ -1165,7 +1411,7 @@ def collect_api_key_from_user(params: Dict) -> Dict:
         service_name = params.get("service_name", "API Service")
         service_url = params.get("service_url", "")
         
-        MCPLogger.log(TOOL_LOG_NAME, f"Collecting API key for {service_name}")
+        _log(TOOL_LOG_NAME, f"Collecting API key for {service_name}")
         
         # Generate HTML for API key collection
         html = _generate_api_key_collection_html(service_name, service_url)
@@ -1192,66 +1438,9 @@ def collect_api_key_from_user(params: Dict) -> Dict:
         return create_error_response(f"Error collecting API key: {str(e)}", with_readme=False)
 
 
-def _generate_api_key_collection_html(service_name: str, service_url: str) -> str:
-    """Generate HTML for API key collection dialog.
-    
-    Uses the web server's /api/settings endpoint to save the API key directly,
-    eliminating the need for QWebChannel bridge communication.
-    
-    Args:
-        service_name: Name of the service requiring the API key
-        service_url: URL where users can obtain an API key
-        
-    Returns:
-        str: Complete HTML for the API key collection dialog
-    """
-    # Get server configuration to construct API endpoint URL
-    from ragtag.shared_config import get_config_manager
-    config_manager = get_config_manager()
-    server_config = config_manager.get_server_config()
-    
-    # Extract server details
-    host = server_config.get("host", "127-0-0-1.local.aurafriday.com")
-    port = server_config.get("port", 31173)
-    enable_https = server_config.get("enable_https", True)
-    protocol = "https" if enable_https else "http"
-    
-    # Get the ephemeral API key for authentication
-    # This is the _internal user's API key that was generated at server startup
-    import sys
-    ephemeral_api_key = None
-    try:
-        # Access friday.py's EPHEMERAL_API_KEY global variable via sys.modules
-        friday_module = sys.modules.get('__main__')
-        if friday_module and hasattr(friday_module, 'EPHEMERAL_API_KEY'):
-            ephemeral_api_key = friday_module.EPHEMERAL_API_KEY
-            MCPLogger.log(TOOL_LOG_NAME, f"Retrieved ephemeral API key for authentication")
-    except Exception as e:
-        MCPLogger.log(TOOL_LOG_NAME, f"Warning: Could not retrieve ephemeral API key: {e}")
-    
-    # Construct the authenticated settings API endpoint URL
-    # Format: {protocol}://{api_key}-{host}:{port}/api/settings/api_keys
-    if ephemeral_api_key:
-        api_url = f"{protocol}://{ephemeral_api_key}-{host}:{port}/api/settings/api_keys"
-    else:
-        # Fallback without authentication (will likely fail but better than crashing)
-        api_url = f"{protocol}://{host}:{port}/api/settings/api_keys"
-        MCPLogger.log(TOOL_LOG_NAME, f"Warning: Using unauthenticated API URL - request may fail")
-    
-    # Create the service URL link if provided
-    service_link_html = ""
-    if service_url:
-        service_link_html = f"""
-        <p style="margin: 15px 0; text-align: center;">
-            <a href="{service_url}" target="_blank" style="color: #0066cc; text-decoration: none;">
-                🔗 Get your {service_name} API key here
-            </a>
-        </p>"""
-    
-    # Determine the API key config key name (convert service_name to uppercase snake_case)
-    api_key_name = service_name.upper().replace(' ', '_').replace('-', '_') + '_API_KEY'
-    
-    html = f"""<!DOCTYPE html>
+# API key collection dialog (str.format syntax: literal braces are doubled). Parsed once at import into
+# (literal, field) pieces so each dialog is a single join rather than a re-format of ~10KB of static CSS/JS.
+_API_KEY_HTML_TEMPLATE = """<!DOCTYPE html>
 <html>
 <head>
     <title>{service_name} API Key Required</title>
@@ -1375,9 +1564,9 @@ def _generate_api_key_collection_html(service_name: str, service_url: str) -> st
     
     <script>
         // Use old JavaScript syntax compatible with PySide2's older WebEngine
-        var apiUrl = '{api_url}';
-        var serviceName = '{service_name}';
-        var apiKeyName = '{api_key_name}';
+        var apiUrl = {api_url_js};
+        var serviceName = {service_name_js};
+        var apiKeyName = {api_key_name_js};
         
         function showError(message) {{
             var errorEl = document.getElementById('errorMessage');
@@ -1433,7 +1622,6 @@ def _generate_api_key_collection_html(service_name: str, service_url: str) -> st
                     var apiKeys = {{}};
                     try {{
                         apiKeys = JSON.parse(xhrGet.responseText) || {{}};
-                        console.log('Parsed existing keys: ' + JSON.stringify(apiKeys));
                     }} catch (e) {{
                         console.log('Parse failed, starting with empty object: ' + e);
                         apiKeys = {{}};
@@ -1441,7 +1629,6 @@ def _generate_api_key_collection_html(service_name: str, service_url: str) -> st
                     
                     // Add/update the new key
                     apiKeys[apiKeyName] = key;
-                    console.log('Updated keys: ' + JSON.stringify(apiKeys));
                     
                     // Now PUT the updated api_keys object back
                     console.log('Step 2: PUT updated keys to: ' + apiUrl);
@@ -1490,9 +1677,8 @@ def _generate_api_key_collection_html(service_name: str, service_url: str) -> st
                         showError('Network error during save (Status: ' + xhrPut.status + ')');
                     }};
                     
-                    var payload = JSON.stringify(apiKeys);
-                    console.log('Sending PUT payload: ' + payload);
-                    xhrPut.send(payload);
+                    // Serialize once, and never echo it: the payload holds every stored API key
+                    xhrPut.send(JSON.stringify(apiKeys));
                 }} else {{
                     console.log('GET failed with status: ' + xhrGet.status);
                     submitBtn.disabled = false;
@@ -1531,8 +1717,147 @@ def _generate_api_key_collection_html(service_name: str, service_url: str) -> st
     </script>
 </body>
 </html>"""
+_API_KEY_HTML_PARTS = tuple(string.Formatter().parse(_API_KEY_HTML_TEMPLATE))
+
+
+def _render_template(parts: Tuple[Tuple[str, Optional[str], Optional[str], Optional[str]], ...], values: Dict[str, str]) -> str:
+    """Fill a template pre-parsed with string.Formatter().parse() (plain {name} fields only)."""
+    return "".join([literal + values[field] if field is not None else literal for literal, field, _, _ in parts])
+
+
+@functools.lru_cache(maxsize=1)
+def _server_endpoint() -> Tuple[str, str, int]:
+    """Return (protocol, host, port) of the local web server; fixed for the process lifetime, so resolved once.
+    
+    The config import stays local to keep ragtag.shared_config out of this tool's import-time dependencies.
+    """
+    from ragtag.shared_config import get_config_manager
+    server_config = get_config_manager().get_server_config()
+    
+    # Extract server details
+    host = server_config.get("host", "127-0-0-1.local.aurafriday.com")
+    port = server_config.get("port", 31173)
+    enable_https = server_config.get("enable_https", True)
+    protocol = "https" if enable_https else "http"
+    return protocol, host, port
+
+
+_SPACE_DASH_TO_UNDERSCORE = str.maketrans(" -", "__")
+
+@functools.lru_cache(maxsize=64)
+def _api_key_name(service_name: str) -> str:
+    """Return the API key config key name for a service: uppercase snake_case plus '_API_KEY'."""
+    return service_name.upper().translate(_SPACE_DASH_TO_UNDERSCORE) + "_API_KEY"
+
+
+def _generate_api_key_collection_html(service_name: str, service_url: str) -> str:
+    """Generate HTML for API key collection dialog.
+    
+    Uses the web server's /api/settings endpoint to save the API key directly,
+    eliminating the need for QWebChannel bridge communication.
+    
+    Args:
+        service_name: Name of the service requiring the API key
+        service_url: URL where users can obtain an API key
+        
+    Returns:
+        str: Complete HTML for the API key collection dialog
+    """
+    # Get server configuration to construct API endpoint URL
+    protocol, host, port = _server_endpoint()
+    
+    # Get the ephemeral API key for authentication
+    # This is the _internal user's API key that was generated at server startup
+    import sys
+    ephemeral_api_key = None
+    try:
+        # Access friday.py's EPHEMERAL_API_KEY global variable via sys.modules
+        friday_module = sys.modules.get('__main__')
+        if friday_module and hasattr(friday_module, 'EPHEMERAL_API_KEY'):
+            ephemeral_api_key = friday_module.EPHEMERAL_API_KEY
+            _log(TOOL_LOG_NAME, f"Retrieved ephemeral API key for authentication")
+    except Exception as e:
+        _log(TOOL_LOG_NAME, f"Warning: Could not retrieve ephemeral API key: {e}", sync=True)
+    
+    # Construct the authenticated settings API endpoint URL
+    # Format: {protocol}://{api_key}-{host}:{port}/api/settings/api_keys
+    if ephemeral_api_key:
+        api_url = f"{protocol}://{ephemeral_api_key}-{host}:{port}/api/settings/api_keys"
+    else:
+        # Fallback without authentication (will likely fail but better than crashing)
+        api_url = f"{protocol}://{host}:{port}/api/settings/api_keys"
+        _log(TOOL_LOG_NAME, f"Warning: Using unauthenticated API URL - request may fail")
     
-    return html
+    return _render_api_key_html(service_name, service_url, api_url)
+
+
+def _js_string(value: str) -> str:
+    """Return value as a JavaScript string literal that is safe to embed inside a <script> block."""
+    return json.dumps(value).replace("</", "<\\/")
+
+
+@functools.lru_cache(maxsize=32)
+def _render_api_key_html(service_name: str, service_url: str, api_url: str) -> str:
+    """Render the API key dialog. Pure in its arguments, so repeat dialogs for a service reuse the same string."""
+    service_name_html = html_escape(service_name)
+    
+    # Create the service URL link if provided
+    service_link_html = ""
+    if service_url:
+        service_link_html = f"""
+        <p style="margin: 15px 0; text-align: center;">
+            <a href="{html_escape(service_url)}" target="_blank" style="color: #0066cc; text-decoration: none;">
+                🔗 Get your {service_name_html} API key here
+            </a>
+        </p>"""
+    
+    return _render_template(_API_KEY_HTML_PARTS, {
+        "service_name": service_name_html,
+        "service_link_html": service_link_html,
+        "api_url_js": _js_string(api_url),
+        "service_name_js": _js_string(service_name),
+        "api_key_name_js": _js_string(_api_key_name(service_name)),
+    })
+
+
+# Shared by the message handlers; the error result itself is built once by _error_result's cache
+_ERR_NO_UI_QUEUE = "No UI request queue available. Ensure friday.py is running."
+
+
+def _ui_call(operation: str, data: Dict, timeout: float, timeout_error: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Send one request to friday.py's UI queue and wait for its reply.
+    
+    Args:
+        operation: UIRequest operation name (friday.py routes on this, so it is not repeated inside data)
+        data: Request payload for friday.py
+        timeout: Seconds to wait for the reply
+        timeout_error: Error message returned if no reply arrives in time
+        
+    Returns:
+        Tuple of (response, error_result) where response is None and error_result is an MCP error response on failure
+    """
+    request_queue = _get_ui_queue()
+    if request_queue is None:
+        return None, create_error_response(_ERR_NO_UI_QUEUE, with_readme=False)
+    
+    reply_queue = _acquire_reply_queue()
+    request_queue.put(UIRequest(operation=operation, data=data, reply_queue=reply_queue))
+    
+    if not reply_queue.event.wait(timeout):
+        return None, create_error_response(timeout_error, with_readme=False)
+    response = reply_queue.value
+    _release_reply_queue(reply_queue)
+    return response, None
+
+
+# Message IDs are a random per-load prefix plus a counter: no urandom call per message, and a reloaded tool
+# module gets a fresh prefix, so its IDs cannot collide with ones friday.py already holds
+_MSGID_PREFIX = f"msg-{os.urandom(8).hex()}-"
+_msgid_counter = itertools.count(1)
+
+def _msgid() -> str:
+    """Generate a unique message ID."""
+    return _MSGID_PREFIX + format(next(_msgid_counter), "x")
 
 
 def send_message_to_user(params: Dict) -> Dict:
@@ -1558,7 +1883,7 @@ def send_message_to_user(params: Dict) -> Dict:
         
         # Create message object
         message = {
-            'id': str(uuid.uuid4()),
+            'id': _msgid(),
             'timestamp': time.time(),
             'direction': 'ai_to_user',
             'type': msg_type,
@@ -1568,53 +1893,34 @@ def send_message_to_user(params: Dict) -> Dict:
             'status': 'pending'
         }
         
-        MCPLogger.log(TOOL_LOG_NAME, f"Sending message to user: [{msg_type}/{priority}] {content[:50]}...")
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Sending message to user: [{msg_type}/{priority}] {content[:50]}...")
         
         # Send via queue to friday.py
-        try:
-            request_queue = sys.modules.get('friday_ui_queue')
-            if request_queue is None:
-                return create_error_response("No UI request queue available. Ensure friday.py is running.", with_readme=False)
-            
-            reply_queue = queue.Queue()
-            
-            request_data = {
-                'operation': 'send_message',
-                'message': message,
-                'show_dashboard': show_dashboard
-            }
-            
-            ui_request = UIRequest(
-                operation="send_message",
-                data=request_data,
-                reply_queue=reply_queue
-            )
-            
-            request_queue.put(ui_request)
-            
-            # Wait for confirmation
-            try:
-                response = reply_queue.get(timeout=5)
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "message_id": message['id'],
-                            "status": "queued",
-                            "timestamp": message['timestamp']
-                        }, indent=2)
-                    }],
-                    "isError": False
-                }
-            except queue.Empty:
-                return create_error_response("Timeout waiting for message queue confirmation", with_readme=False)
-                
-        except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Error sending message: {str(e)}")
-            return create_error_response(f"Error sending message: {str(e)}", with_readme=False)
-            
+        request_data = {
+            'message': message,
+            'show_dashboard': show_dashboard
+        }
+        
+        # Wait for confirmation
+        _, error_result = _ui_call("send_message", request_data, 5, "Timeout waiting for message queue confirmation")
+        if error_result is not None:
+            return error_result
+        
+        return {
+            "content": [{
+                "type": "text",
+                "text": _dumps_compact({
+                    "message_id": message['id'],
+                    "status": "queued",
+                    "timestamp": message['timestamp']
+                })
+            }],
+            "isError": False
+        }
+        
     except Exception as e:
+        _log(TOOL_LOG_NAME, f"Error sending message: {str(e)}", sync=True)
         return create_error_response(f"Error in send_message: {str(e)}", with_readme=False)
 
 
@@ -1626,192 +1932,147 @@ def check_user_messages(params: Dict) -> Dict:
     - mark_as_read: bool (default: True)
     - filter_type: Optional filter by message type
     - since_timestamp: Only get messages after this time
+    - fields: Optional list of message fields to return (default: all)
     """
     try:
         mark_as_read = params.get("mark_as_read", True)
         filter_type = params.get("filter_type")
         since_timestamp = params.get("since_timestamp")
+        fields = params.get("fields")
+        if fields is not None and not all(type(field) is str for field in fields):
+            return create_error_response("Parameter 'fields' must be a list of message field names (strings)", with_readme=False)
         
-        MCPLogger.log(TOOL_LOG_NAME, f"Checking for user messages (filter_type={filter_type}, since={since_timestamp})")
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Checking for user messages (filter_type={filter_type}, since={since_timestamp})")
         
         # Get messages from friday.py queue
-        try:
-            request_queue = sys.modules.get('friday_ui_queue')
-            if request_queue is None:
-                return create_error_response("No UI request queue available. Ensure friday.py is running.", with_readme=False)
-            
-            reply_queue = queue.Queue()
-            
-            request_data = {
-                'operation': 'check_messages',
-                'mark_as_read': mark_as_read,
-                'filter_type': filter_type,
-                'since_timestamp': since_timestamp
-            }
-            
-            ui_request = UIRequest(
-                operation="check_messages",
-                data=request_data,
-                reply_queue=reply_queue
-            )
-            
-            request_queue.put(ui_request)
-            
-            # Wait for response
-            try:
-                response = reply_queue.get(timeout=5)
-                messages = response.get('messages', [])
-                
-                MCPLogger.log(TOOL_LOG_NAME, f"Retrieved {len(messages)} messages from user")
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "messages": messages,
-                            "count": len(messages)
-                        }, indent=2)
-                    }],
-                    "isError": False
-                }
-            except queue.Empty:
-                return create_error_response("Timeout waiting for message check response", with_readme=False)
-                
-        except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Error checking messages: {str(e)}")
-            return create_error_response(f"Error checking messages: {str(e)}", with_readme=False)
-            
+        request_data = {
+            'mark_as_read': mark_as_read,
+            'filter_type': filter_type,
+            'since_timestamp': since_timestamp,
+            'fields': fields
+        }
+        
+        # Wait for response
+        response, error_result = _ui_call("check_messages", request_data, 5, "Timeout waiting for message check response")
+        if error_result is not None:
+            return error_result
+        messages = response.get('messages', [])
+        
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Retrieved {len(messages)} messages from user")
+        
+        # Project here too, so only the requested fields are serialized even if friday.py sent whole messages
+        if fields:
+            messages = [{field: message[field] for field in fields if field in message} for message in messages]
+        
+        result = {
+            "content": [{
+                "type": "text",
+                "text": _dumps_compact({
+                    "messages": messages,
+                    "count": len(messages)
+                })
+            }],
+            "isError": False
+        }
+        if not messages:
+            result["_meta"] = {"cache_hint": "no-cache"}  # Empty polls are transient; keep them out of client caches
+        return result
+        
     except Exception as e:
+        _log(TOOL_LOG_NAME, f"Error checking messages: {str(e)}", sync=True)
         return create_error_response(f"Error in check_messages: {str(e)}", with_readme=False)
 
 
 def show_message_dashboard(params: Dict) -> Dict:
     """Show the persistent message dashboard window."""
     try:
-        MCPLogger.log(TOOL_LOG_NAME, "Showing message dashboard")
+        _log(TOOL_LOG_NAME, "Showing message dashboard")
+        
+        _, error_result = _ui_call("show_dashboard", {}, 10, "Timeout waiting for dashboard to show")
+        if error_result is not None:
+            return error_result
+        
+        return {
+            "content": [{
+                "type": "text",
+                "text": _dumps_compact({
+                    "status": "success",
+                    "message": "Dashboard shown"
+                })
+            }],
+            "isError": False
+        }
         
-        try:
-            request_queue = sys.modules.get('friday_ui_queue')
-            if request_queue is None:
-                return create_error_response("No UI request queue available. Ensure friday.py is running.", with_readme=False)
-            
-            reply_queue = queue.Queue()
-            
-            request_data = {
-                'operation': 'show_dashboard'
-            }
-            
-            ui_request = UIRequest(
-                operation="show_dashboard",
-                data=request_data,
-                reply_queue=reply_queue
-            )
-            
-            request_queue.put(ui_request)
-            
-            try:
-                response = reply_queue.get(timeout=10)
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "status": "success",
-                            "message": "Dashboard shown"
-                        }, indent=2)
-                    }],
-                    "isError": False
-                }
-            except queue.Empty:
-                return create_error_response("Timeout waiting for dashboard to show", with_readme=False)
-                
-        except Exception as e:
-            MCPLogger.log(TOOL_LOG_NAME, f"Error showing dashboard: {str(e)}")
-            return create_error_response(f"Error showing dashboard: {str(e)}", with_readme=False)
-            
     except Exception as e:
+        _log(TOOL_LOG_NAME, f"Error showing dashboard: {str(e)}", sync=True)
         return create_error_response(f"Error in show_dashboard: {str(e)}", with_readme=False)
 
 
 def hide_message_dashboard(params: Dict) -> Dict:
     """Hide the message dashboard window."""
     try:
-        MCPLogger.log(TOOL_LOG_NAME, "Hiding message dashboard")
+        _log(TOOL_LOG_NAME, "Hiding message dashboard")
+        
+        _, error_result = _ui_call("hide_dashboard", {}, 5, "Timeout waiting for dashboard to hide")
+        if error_result is not None:
+            return error_result
+        return {
+            "content": [{
+                "type": "text",
+                "text": _dumps_compact({"status": "success", "message": "Dashboard hidden"})
+            }],
+            "isError": False
+        }
         
-        try:
-            request_queue = sys.modules.get('friday_ui_queue')
-            if request_queue is None:
-                return create_error_response("No UI request queue available.", with_readme=False)
-            
-            reply_queue = queue.Queue()
-            
-            ui_request = UIRequest(
-                operation="hide_dashboard",
-                data={'operation': 'hide_dashboard'},
-                reply_queue=reply_queue
-            )
-            
-            request_queue.put(ui_request)
-            
-            try:
-                response = reply_queue.get(timeout=5)
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({"status": "success", "message": "Dashboard hidden"}, indent=2)
-                    }],
-                    "isError": False
-                }
-            except queue.Empty:
-                return create_error_response("Timeout waiting for dashboard to hide", with_readme=False)
-                
-        except Exception as e:
-            return create_error_response(f"Error hiding dashboard: {str(e)}", with_readme=False)
-            
     except Exception as e:
         return create_error_response(f"Error in hide_dashboard: {str(e)}", with_readme=False)
 
 
 def get_message_history(params: Dict) -> Dict:
-    """Get all message history."""
+    """Get message history, most recent `limit` entries (0 = all), optionally only those before `before_timestamp`.
+    
+    friday.py is sent `limit + 1` and expected to reply oldest-first; a `has_more` flag in its reply is honoured when present.
+    """
     try:
-        MCPLogger.log(TOOL_LOG_NAME, "Getting message history")
+        limit = params.get("limit", 200)
+        before_timestamp = params.get("before_timestamp")
+        if limit < 0:
+            return create_error_response(f"Parameter 'limit' must be 0 or greater, got {limit}", with_readme=False)
+        # "number" is not type-checked by the schema validator; bool is an int subclass, so exclude it explicitly
+        if before_timestamp is not None and (type(before_timestamp) is bool or not isinstance(before_timestamp, (int, float))):
+            return create_error_response(f"Parameter 'before_timestamp' must be a number, got {type(before_timestamp).__name__}. Please provide a numeric timestamp.", with_readme=False)
+        
+        if _LOG_ENABLED:
+            _log(TOOL_LOG_NAME, f"Getting message history (limit={limit}, before={before_timestamp})")
+        
+        # Ask for one row more than the page so an older entry beyond it shows up as has_more
+        response, error_result = _ui_call("get_message_history", {'limit': limit + 1 if limit else 0, 'before_timestamp': before_timestamp}, 5, "Timeout waiting for message history")
+        if error_result is not None:
+            return error_result
+        # History is expected oldest-first (chronological), so the newest page is the tail of the list
+        history = response.get('history', [])
+        
+        # Apply the page here too, so only `limit` entries are serialized even if friday.py sent everything
+        if before_timestamp is not None:
+            history = [entry for entry in history if entry.get('timestamp', 0) < before_timestamp]
+        has_more = bool(response.get('has_more')) or 0 < limit < len(history)
+        if 0 < limit < len(history):
+            history = history[-limit:]
+        
+        return {
+            "content": [{
+                "type": "text",
+                "text": _dumps_compact({
+                    "history": history,
+                    "count": len(history),
+                    "has_more": has_more
+                })
+            }],
+            "isError": False
+        }
         
-        try:
-            request_queue = sys.modules.get('friday_ui_queue')
-            if request_queue is None:
-                return create_error_response("No UI request queue available.", with_readme=False)
-            
-            reply_queue = queue.Queue()
-            
-            ui_request = UIRequest(
-                operation="get_message_history",
-                data={'operation': 'get_message_history'},
-                reply_queue=reply_queue
-            )
-            
-            request_queue.put(ui_request)
-            
-            try:
-                response = reply_queue.get(timeout=5)
-                history = response.get('history', [])
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "history": history,
-                            "count": len(history)
-                        }, indent=2)
-                    }],
-                    "isError": False
-                }
-            except queue.Empty:
-                return create_error_response("Timeout waiting for message history", with_readme=False)
-                
-        except Exception as e:
-            return create_error_response(f"Error getting message history: {str(e)}", with_readme=False)
-            
     except Exception as e:
         return create_error_response(f"Error in get_message_history: {str(e)}", with_readme=False)
 
@@ -1819,46 +2080,54 @@ def get_message_history(params: Dict) -> Dict:
 def clear_message_queues(params: Dict) -> Dict:
     """Clear all message queues."""
     try:
-        MCPLogger.log(TOOL_LOG_NAME, "Clearing message queues")
+        _log(TOOL_LOG_NAME, "Clearing message queues")
+        
+        _, error_result = _ui_call("clear_messages", {}, 5, "Timeout waiting for clear confirmation")
+        if error_result is not None:
+            return error_result
+        
+        return {
+            "content": [{
+                "type": "text",
+                "text": _dumps_compact({
+                    "status": "success",
+                    "message": "Message queues cleared"
+                })
+            }],
+            "isError": False
+        }
         
-        try:
-            request_queue = sys.modules.get('friday_ui_queue')
-            if request_queue is None:
-                return create_error_response("No UI request queue available.", with_readme=False)
-            
-            reply_queue = queue.Queue()
-            
-            ui_request = UIRequest(
-                operation="clear_messages",
-                data={'operation': 'clear_messages'},
-                reply_queue=reply_queue
-            )
-            
-            request_queue.put(ui_request)
-            
-            try:
-                response = reply_queue.get(timeout=5)
-                
-                return {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "status": "success",
-                            "message": "Message queues cleared"
-                        }, indent=2)
-                    }],
-                    "isError": False
-                }
-            except queue.Empty:
-                return create_error_response("Timeout waiting for clear confirmation", with_readme=False)
-                
-        except Exception as e:
-            return create_error_response(f"Error clearing messages: {str(e)}", with_readme=False)
-            
     except Exception as e:
         return create_error_response(f"Error in clear_messages: {str(e)}", with_readme=False)
 
 
+def _show_popup(params: Dict) -> Dict:
+    """show_popup: an HTML window that is always non-modal."""
+    params["modal"] = False
+    return show_html_window(params)
+
+def _show_dialog(params: Dict) -> Dict:
+    """show_dialog: an HTML window that is modal unless the caller says otherwise."""
+    params.setdefault("modal", True)
+    return show_html_window(params)
+
+# Operation -> handler; each takes the validated parameters dict
+_OP_DISPATCH = {
+    "test_queue": test_queue_communication,
+    "show_toast": show_toast_notification,
+    "collect_api_key": collect_api_key_from_user,
+    "show_popup": _show_popup,
+    "show_dialog": _show_dialog,
+    "send_message": send_message_to_user,
+    "check_messages": check_user_messages,
+    "show_dashboard": show_message_dashboard,
+    "hide_dashboard": hide_message_dashboard,
+    "get_message_history": get_message_history,
+    "clear_messages": clear_message_queues,
+}
+_VALID_OPERATIONS_TEXT = ", ".join(_REAL_PARAMS_PROPERTIES["operation"]["enum"])
+
+
 def handle_user(input_param: Dict) -> Dict:
     """Handle user interaction tool operations via MCP interface."""
     try:
@@ -1874,7 +2143,8 @@ def handle_user(input_param: Dict) -> Dict:
         if isinstance(input_param, dict) and input_param.get("operation") == "readme":
             return {
                 "content": [{"type": "text", "text": readme(True)}],
-                "isError": False
+                "isError": False,
+                "_meta": _README_RESULT_META
             }
             
         # Validate input structure first
@@ -1887,23 +2157,18 @@ def handle_user(input_param: Dict) -> Dict:
         # Check for inter-tool token (starts with "-")
         is_inter_tool_call = False
         if provided_token and provided_token.startswith("-"):
-            # Parse inter-tool token: "-{calling_tool_token}-{target_tool_token}"
-            try:
-                parts = provided_token[1:].split("-", 1)  # Remove leading "-" and split once
-                if len(parts) == 2:
-                    calling_tool_token, target_tool_token = parts
-                    if target_tool_token == TOOL_UNLOCK_TOKEN:
-                        is_inter_tool_call = True
-                        MCPLogger.log(TOOL_LOG_NAME, f"Inter-tool call detected from tool with token: {calling_tool_token[:8]}...")
-                    else:
-                        MCPLogger.log(TOOL_LOG_NAME, f"Inter-tool call attempted but target token mismatch")
-                else:
-                    MCPLogger.log(TOOL_LOG_NAME, f"Malformed inter-tool token: {provided_token[:20]}...")
-            except Exception as e:
-                MCPLogger.log(TOOL_LOG_NAME, f"Error parsing inter-tool token: {e}")
+            # Parse inter-tool token: "-{calling_tool_token}-{target_tool_token}" (partition: one tuple, no list)
+            calling_tool_token, separator, target_tool_token = provided_token[1:].partition("-")
+            if not separator:
+                _log(TOOL_LOG_NAME, f"Malformed inter-tool token: {provided_token[:20]}...")
+            elif _token_matches(target_tool_token):
+                is_inter_tool_call = True
+                _log(TOOL_LOG_NAME, f"Inter-tool call detected from tool with token: {calling_tool_token[:8]}...")
+            else:
+                _log(TOOL_LOG_NAME, "Inter-tool call attempted but target token mismatch")
         
         # Validate token (either exact match or valid inter-tool call)
-        if provided_token != TOOL_UNLOCK_TOKEN and not is_inter_tool_call:
+        if not is_inter_tool_call and not _token_matches(provided_token):
             return create_error_response("Invalid or missing tool_unlock_token: this indicates your context is missing the following details, which are needed to correctly use this tool:", with_readme=True )
 
         # Validate all parameters using schema
@@ -1914,66 +2179,22 @@ def handle_user(input_param: Dict) -> Dict:
         # Extract validated parameters
         operation = validated_params.get("operation")
         
-        # Handle operations
-        if operation == "test_queue":
-            # Test queue communication without Qt operations
-            result = test_queue_communication(validated_params)
-            return result
-        elif operation == "show_toast":
-            # Show toast notification message
-            result = show_toast_notification(validated_params)
-            return result
-        elif operation == "collect_api_key":
-            # Collect API key from user using a specialized dialog
-            result = collect_api_key_from_user(validated_params)
-            return result
-        elif operation in ["show_popup", "show_dialog"]:
-            # Both operations use the same handler, with modal determined by the operation or explicit parameter
-            if operation == "show_popup":
-                validated_params["modal"] = False  # Force non-modal for show_popup
-            elif operation == "show_dialog" and "modal" not in validated_params:
-                validated_params["modal"] = True   # Default to modal for show_dialog
-                
-            result = show_html_window(validated_params)
-            return result
-        elif operation == "send_message":
-            # Send async message to user without blocking
-            result = send_message_to_user(validated_params)
-            return result
-        elif operation == "check_messages":
-            # Check for messages from user
-            result = check_user_messages(validated_params)
-            return result
-        elif operation == "show_dashboard":
-            # Show persistent message dashboard
-            result = show_message_dashboard(validated_params)
-            return result
-        elif operation == "hide_dashboard":
-            # Hide the message dashboard
-            result = hide_message_dashboard(validated_params)
-            return result
-        elif operation == "get_message_history":
-            # Get all message history
-            result = get_message_history(validated_params)
-            return result
-        elif operation == "clear_messages":
-            # Clear message queues
-            result = clear_message_queues(validated_params)
-            return result
-        elif operation == "readme":
+        # Dispatch to the operation's handler
+        handler = _OP_DISPATCH.get(operation)
+        if handler is not None:
+            return handler(validated_params)
+        if operation == "readme":
             # This should have been handled above, but just in case
             return {
                 "content": [{"type": "text", "text": readme(True)}],
-                "isError": False
+                "isError": False,
+                "_meta": _README_RESULT_META
             }
-        else:
-            # Get valid operations from the schema enum
-            valid_operations = TOOLS[0]["real_parameters"]["properties"]["operation"]["enum"]
-            return create_error_response(f"Unknown operation: '{operation}'. Available operations: {', '.join(valid_operations)}", with_readme=True)
+        return create_error_response(f"Unknown operation: '{operation}'. Available operations: {_VALID_OPERATIONS_TEXT}", with_readme=True)
             
     except Exception as e:
-        MCPLogger.log(TOOL_LOG_NAME, f"CRITICAL ERROR in handle_user: {str(e)}")
-        MCPLogger.log(TOOL_LOG_NAME, f"Complete stack trace: {traceback.format_exc()}")
+        _log(TOOL_LOG_NAME, f"CRITICAL ERROR in handle_user: {str(e)}", sync=True)
+        _log(TOOL_LOG_NAME, "Complete stack trace: %s", traceback.format_exc, sync=True)
         return create_error_response(f"Error in user interaction operation: {str(e)}", with_readme=True)
 
 # Map of tool names to their handlers